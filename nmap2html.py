@@ -14,16 +14,26 @@ Usage:
     python nmap2html.py scan.xml -o report.html     # custom output
     python nmap2html.py scan.xml --format md        # markdown only
     python nmap2html.py scan.xml --format csv       # CSV output
+    python nmap2html.py scan.xml --all-scripts      # full NSE output
+    python nmap2html.py scan.xml -j 0               # parse on all cores
+    python nmap2html.py scan.xml --split-hosts out/ # one report per host
 """
 
+import os
 import sys
 import re
+import time
+import html
+import hashlib
 import argparse
 from xml.etree import ElementTree as ET
 from dataclasses import dataclass, field
 from typing import Optional
 from pathlib import Path
 from io import StringIO
+from functools import lru_cache
+from itertools import groupby, repeat
+from concurrent.futures import ProcessPoolExecutor
 
 
 # =============================================================================
@@ -100,6 +110,46 @@ def fix_nmap_xml(content: str) -> ET.Element:
 # Data Classes
 # =============================================================================
 
+class HostnameSet:
+    """
+    Insertion-ordered set of hostnames with O(1) membership.
+    Supports the list operations the generators use (len, iteration,
+    indexing/slicing, join) and compares equal to a list of the same names.
+    """
+
+    def __init__(self, names=()):
+        self._names = {}
+        self.update(names)
+
+    def add(self, name: str):
+        if name:
+            self._names.setdefault(name, None)
+
+    def update(self, names):
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        return list(self._names)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (HostnameSet, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"HostnameSet({list(self._names)!r})"
+
+
 @dataclass
 class PortInfo:
     port: int
@@ -113,12 +163,13 @@ class PortInfo:
     tunnel: str = ""
     cpe: list = field(default_factory=list)
     scripts: dict = field(default_factory=dict)
+    script_refs: dict = field(default_factory=dict)
 
 
 @dataclass
 class HostInfo:
     ip: str
-    hostnames: list = field(default_factory=list)
+    hostnames: HostnameSet = field(default_factory=HostnameSet)
     os_match: str = ""
     os_accuracy: str = ""
     os_family: str = ""
@@ -128,15 +179,135 @@ class HostInfo:
     mac: str = ""
     vendor: str = ""
     distance: str = ""
+    script_refs: dict = field(default_factory=dict)
+
+
+# =============================================================================
+# Script Store - full NSE output, deduplicated
+# =============================================================================
+
+def _script_children(elem) -> tuple:
+    """Convert <elem>/<table> children into an interned, hashable tree."""
+    children = []
+    for child in elem:
+        key = child.get("key")
+        if key is not None:
+            key = sys.intern(key)
+        if child.tag == "elem":
+            children.append(("elem", key, sys.intern(child.text or "")))
+        elif child.tag == "table":
+            children.append(("table", key, _script_children(child)))
+    return tuple(children)
+
+
+class ScriptStore:
+    """
+    Content-addressed store for full NSE script output.
+    Identical outputs (banners, cert chains, host keys) are kept once and
+    referenced by digest, so memory grows with unique outputs, not hosts.
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.refs = {}
+
+    def add(self, script_elem) -> str:
+        """
+        Store a <script> element and return its digest. The digest is
+        interned, so every reference shares the store's key string.
+        """
+        tree = (
+            sys.intern(script_elem.get("id", "")),
+            sys.intern(script_elem.get("output", "")),
+            _script_children(script_elem),
+        )
+        digest = sys.intern(hashlib.sha1(repr(tree).encode("utf-8")).hexdigest()[:16])
+        if digest not in self.blobs:
+            self.blobs[digest] = tree
+        self.refs[digest] = self.refs.get(digest, 0) + 1
+        return digest
+
+    def get(self, digest: str) -> tuple:
+        return self.blobs[digest]
+
+    def merge(self, other: "ScriptStore"):
+        """Fold another store into this one (digests are content addresses)."""
+        for digest, tree in other.blobs.items():
+            digest = sys.intern(digest)
+            self.blobs.setdefault(digest, tree)
+            self.refs[digest] = self.refs.get(digest, 0) + other.refs.get(digest, 0)
+
+    def adopt(self, hosts: list):
+        """
+        Re-intern script_refs of hosts built elsewhere (e.g. unpickled from
+        a worker process) so they share this store's key strings again.
+        """
+        for host in hosts:
+            for owner in [host, *host.ports]:
+                owner.script_refs = {sys.intern(script_id): sys.intern(digest)
+                                     for script_id, digest in owner.script_refs.items()}
+
+    def subset(self, digests) -> "ScriptStore":
+        """Return a store holding only the given digests (e.g. one host's)."""
+        store = ScriptStore()
+        for digest in digests:
+            store.blobs[digest] = self.blobs[digest]
+            store.refs[digest] = store.refs.get(digest, 0) + 1
+        return store
+
+    def __len__(self):
+        return len(self.blobs)
+
+
+def _html_text(text: str) -> str:
+    """Escape text for single-line embedding in the markdown stream."""
+    return html.escape(text).replace("*", "&#42;").replace("\n", "&#10;")
+
+
+def _render_script_children(children: tuple) -> str:
+    items = []
+    for kind, key, value in children:
+        label = f"<b>{_html_text(key)}</b>" if key is not None else ""
+        if kind == "table":
+            items.append(f"<li>{label}{_render_script_children(value)}</li>")
+        else:
+            sep = ": " if label else ""
+            items.append(f"<li>{label}{sep}{_html_text(value)}</li>")
+    return f"<ul>{''.join(items)}</ul>"
+
+
+def render_script_blob(digest: str, tree: tuple, refs: int = 1) -> str:
+    """Render one stored script output as an expandable HTML block."""
+    script_id, output, children = tree
+    parts = [
+        f'<details class="nse-blob" id="nse-{digest}">',
+        f"<summary>{_html_text(script_id)} <code>{digest}</code> ({refs} ref{'s' if refs != 1 else ''})</summary>",
+    ]
+    if output.strip():
+        parts.append(f"<pre>{_html_text(output.strip())}</pre>")
+    if children:
+        parts.append(_render_script_children(children))
+    parts.append("</details>")
+    return "".join(parts)
+
+
+def render_script_refs(label: str, script_refs: dict) -> str:
+    """Render an expandable per-port/per-host list of links into the store."""
+    links = "".join(
+        f'<li><a href="#nse-{digest}">{_html_text(script_id)}</a></li>'
+        for script_id, digest in script_refs.items()
+    )
+    return (f'<details class="nse"><summary>{_html_text(label)} scripts '
+            f'({len(script_refs)})</summary><ul>{links}</ul></details>')
 
 
 # =============================================================================
 # Script Extractors
 # =============================================================================
 
-def extract_hostname_from_scripts(port_elem) -> list:
+def extract_hostname_from_scripts(port_elem) -> HostnameSet:
     """Extract hostnames from various NSE scripts."""
-    hostnames = []
+    hostnames = HostnameSet()
     
     for script in port_elem.findall(".//script"):
         script_id = script.get("id", "")
@@ -146,8 +317,8 @@ def extract_hostname_from_scripts(port_elem) -> list:
             for elem in script.findall(".//elem"):
                 key = elem.get("key", "")
                 if key in ["DNS_Computer_Name", "NetBIOS_Computer_Name", "DNS_Domain_Name"]:
-                    if elem.text and elem.text not in hostnames:
-                        hostnames.append(elem.text)
+                    if elem.text:
+                        hostnames.add(elem.text)
         
         # SSL Certificate
         elif script_id == "ssl-cert":
@@ -157,8 +328,7 @@ def extract_hostname_from_scripts(port_elem) -> list:
                         cn = elem.text
                         if cn.startswith("*."):
                             cn = cn[2:]
-                        if cn not in hostnames:
-                            hostnames.append(cn)
+                        hostnames.add(cn)
             # SAN
             for table in script.findall(".//table[@key='extensions']"):
                 for ext_table in table.findall("table"):
@@ -172,16 +342,15 @@ def extract_hostname_from_scripts(port_elem) -> list:
                                     dns = part[4:].strip()
                                     if dns.startswith("*."):
                                         dns = dns[2:]
-                                    if dns and dns not in hostnames:
-                                        hostnames.append(dns)
+                                    hostnames.add(dns)
         
         # SMB OS Discovery
         elif script_id == "smb-os-discovery":
             for elem in script.findall(".//elem"):
                 key = elem.get("key", "")
                 if key in ["fqdn", "computer", "server"]:
-                    if elem.text and elem.text not in hostnames:
-                        hostnames.append(elem.text)
+                    if elem.text:
+                        hostnames.add(elem.text)
         
         # NetBIOS
         elif script_id == "nbstat":
@@ -191,8 +360,8 @@ def extract_hostname_from_scripts(port_elem) -> list:
                     parts = line.split()
                     if parts:
                         name = parts[0].strip()
-                        if name and name not in hostnames and not name.startswith("_"):
-                            hostnames.append(name)
+                        if not name.startswith("_"):
+                            hostnames.add(name)
     
     return hostnames
 
@@ -280,8 +449,12 @@ def extract_script_info(port_elem) -> dict:
 # XML Parser
 # =============================================================================
 
-def parse_nmap_xml(root: ET.Element) -> list:
-    """Parse nmap XML element tree and return list of HostInfo objects."""
+def parse_nmap_xml(root: ET.Element, script_store: Optional[ScriptStore] = None) -> list:
+    """
+    Parse nmap XML element tree and return list of HostInfo objects.
+    If script_store is given, full script output is kept in it and
+    referenced from PortInfo/HostInfo.script_refs.
+    """
     hosts = []
     
     for host_elem in root.findall("host"):
@@ -305,9 +478,7 @@ def parse_nmap_xml(root: ET.Element) -> list:
         
         # Hostnames from nmap
         for hostname in host_elem.findall(".//hostnames/hostname"):
-            name = hostname.get("name", "")
-            if name and name not in host.hostnames:
-                host.hostnames.append(name)
+            host.hostnames.add(hostname.get("name", ""))
         
         # OS Detection
         os_match = host_elem.find(".//osmatch")
@@ -329,6 +500,13 @@ def parse_nmap_xml(root: ET.Element) -> list:
         if distance_elem is not None:
             host.distance = distance_elem.get("value", "")
         
+        # Host scripts
+        if script_store is not None:
+            for script in host_elem.findall("hostscript/script"):
+                script_id = sys.intern(script.get("id", ""))
+                if script_id not in host.script_refs:  # keep the first of duplicate ids
+                    host.script_refs[script_id] = script_store.add(script)
+        
         # Ports
         for port_elem in host_elem.findall(".//port"):
             state_elem = port_elem.find("state")
@@ -355,14 +533,17 @@ def parse_nmap_xml(root: ET.Element) -> list:
                         port.cpe.append(cpe_elem.text)
             
             # Extract hostnames from scripts
-            script_hostnames = extract_hostname_from_scripts(port_elem)
-            for hn in script_hostnames:
-                if hn not in host.hostnames:
-                    host.hostnames.append(hn)
+            host.hostnames.update(extract_hostname_from_scripts(port_elem))
             
             # Extract script info
             port.scripts = extract_script_info(port_elem)
             
+            if script_store is not None:
+                for script in port_elem.findall("script"):
+                    script_id = sys.intern(script.get("id", ""))
+                    if script_id not in port.script_refs:  # keep the first of duplicate ids
+                        port.script_refs[script_id] = script_store.add(script)
+            
             host.ports.append(port)
         
         hosts.append(host)
@@ -370,12 +551,211 @@ def parse_nmap_xml(root: ET.Element) -> list:
     return hosts
 
 
+# =============================================================================
+# Parallel Parser - per-host byte ranges across worker processes
+# =============================================================================
+
+NMAPRUN_BLOCK_PATTERN = re.compile(rb'<nmaprun[^>]*>.*?</nmaprun>', re.DOTALL)
+HOST_SPAN_PATTERN = re.compile(rb'<host[\s>].*?</host>', re.DOTALL)
+
+
+def find_host_spans(data: bytes) -> tuple:
+    """
+    Locate the <host> elements of each complete nmaprun block of a
+    (possibly --append-output) scan file.
+    Returns (spans, bad_blocks): spans are (start, end, block) byte offsets,
+    bad_blocks maps block index -> error for blocks whose non-host XML
+    does not parse.
+    """
+    blocks = list(NMAPRUN_BLOCK_PATTERN.finditer(data))
+    if not blocks:
+        raise ValueError("No valid nmaprun blocks found in XML")
+    spans = []
+    bad_blocks = {}
+    for index, block in enumerate(blocks):
+        skeleton = []
+        pos = block.start()
+        for host in HOST_SPAN_PATTERN.finditer(data, block.start(), block.end()):
+            skeleton.append(data[pos:host.start()])
+            pos = host.end()
+            spans.append((host.start(), host.end(), index))
+        skeleton.append(data[pos:block.end()])
+        try:
+            ET.fromstring(b"".join(skeleton))
+        except ET.ParseError as e:
+            bad_blocks[index] = str(e)
+    return spans, bad_blocks
+
+
+def _parse_host_chunk(path: str, spans: list, full_scripts: bool) -> list:
+    """
+    Worker: read one contiguous byte range and parse its hosts, grouped by
+    nmaprun block. Returns [(block, hosts, script_store, error)].
+    """
+    start, end = spans[0][0], spans[-1][1]
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    
+    results = []
+    for block, group in groupby(spans, key=lambda span: span[2]):
+        blob = b"".join(data[s - start:e - start] for s, e, _ in group)
+        try:
+            root = ET.fromstring(b"<nmaprun>" + blob + b"</nmaprun>")
+        except ET.ParseError as e:
+            results.append((block, [], None, str(e)))
+            continue
+        script_store = ScriptStore() if full_scripts else None
+        results.append((block, parse_nmap_xml(root, script_store), script_store, None))
+    return results
+
+
+def parse_nmap_file_parallel(path: str, workers: Optional[int] = None,
+                             script_store: Optional[ScriptStore] = None,
+                             chunks_per_worker: int = 4) -> list:
+    """
+    Parse a single nmap XML file across a process pool.
+    Host byte ranges are split into contiguous chunks, parsed and extracted
+    in workers, and returned in original file order. Like fix_nmap_xml, a
+    block that fails to parse is dropped whole, so the result equals
+    fix_nmap_xml -> parse_nmap_xml.
+    """
+    with open(path, 'rb') as f:
+        spans, bad_blocks = find_host_spans(f.read())
+    
+    results = []
+    if spans:
+        workers = workers or os.cpu_count() or 1
+        n_chunks = min(len(spans), workers * chunks_per_worker)
+        size = -(-len(spans) // n_chunks)
+        chunks = [spans[i:i + size] for i in range(0, len(spans), size)]
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_results in pool.map(_parse_host_chunk, repeat(path), chunks,
+                                          repeat(script_store is not None)):
+                results.extend(chunk_results)
+    
+    for block, _, _, error in results:
+        if error is not None:
+            bad_blocks.setdefault(block, error)
+    for block, error in sorted(bad_blocks.items()):
+        print(f"[!] Warning: Could not parse block {block+1}: {error}", file=sys.stderr)
+    if 0 in bad_blocks:
+        # fix_nmap_xml builds on the first block and gives up without it
+        raise ValueError("Could not parse any nmaprun blocks")
+    
+    hosts = []
+    for block, block_hosts, block_store, _ in results:
+        if block in bad_blocks:
+            continue
+        hosts.extend(block_hosts)
+        if script_store is not None:
+            script_store.merge(block_store)
+            script_store.adopt(block_hosts)
+    
+    return hosts
+
+
+def parse_nmap_file(path: str, script_store: Optional[ScriptStore] = None) -> list:
+    """Serial reference path: read -> fix_nmap_xml -> parse_nmap_xml."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return parse_nmap_xml(fix_nmap_xml(content), script_store)
+
+
+def benchmark_parallel(path: str, worker_counts: list, rounds: int = 3) -> str:
+    """Time the serial path against the parallel path for each worker count."""
+    def best_of(fn):
+        best, hosts = None, None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            hosts = fn()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        return best, hosts
+    
+    serial_time, serial_hosts = best_of(lambda: parse_nmap_file(path))
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    
+    lines = [
+        f"# {path}: {size_mb:.1f} MB, {len(serial_hosts)} host(s), "
+        f"{os.cpu_count()} CPU(s), best of {rounds}",
+        "| Mode | Workers | Seconds | Hosts/s | Speedup | Identical |",
+        "|:-----|--------:|--------:|--------:|--------:|:----------|",
+        f"| serial | 1 | {serial_time:.3f} | {len(serial_hosts) / serial_time:.0f} | 1.00x | - |",
+    ]
+    for workers in worker_counts:
+        elapsed, hosts = best_of(lambda: parse_nmap_file_parallel(path, workers))
+        lines.append(
+            f"| parallel | {workers} | {elapsed:.3f} | {len(hosts) / elapsed:.0f} | "
+            f"{serial_time / elapsed:.2f}x | {'yes' if hosts == serial_hosts else 'NO'} |"
+        )
+    return "\n".join(lines)
+
+
+# =============================================================================
+# Hostname Index
+# =============================================================================
+
+def _normalize_hostname(name: str) -> str:
+    name = name.strip().lower().rstrip(".")
+    return name[2:] if name.startswith("*.") else name
+
+
+def _parent_domains(name: str) -> list:
+    """Return parent domains with at least two labels (a.b.c.d -> b.c.d, c.d)."""
+    labels = name.split(".")
+    if ":" in name or all(label.isdigit() for label in labels):
+        return []  # IP address, not a DNS name
+    return [".".join(labels[i:]) for i in range(1, len(labels) - 1)]
+
+
+class HostnameIndex:
+    """
+    Reverse index from hostname and parent domain to IPs across a scan.
+    Keys are lower-cased; IPs keep first-seen order.
+    """
+
+    def __init__(self, hosts: list = ()):
+        self.by_name = {}
+        self.by_domain = {}
+        for host in hosts:
+            self.add_host(host)
+
+    def add_host(self, host: HostInfo):
+        for name in host.hostnames:
+            name = _normalize_hostname(name)
+            if not name:
+                continue
+            self.by_name.setdefault(name, {})[host.ip] = None
+            for domain in _parent_domains(name):
+                self.by_domain.setdefault(domain, {})[host.ip] = None
+
+    def lookup(self, name: str) -> list:
+        """IPs serving a hostname, or any name under it when it is a domain."""
+        key = _normalize_hostname(name)
+        ips = dict(self.by_name.get(key, {}))
+        ips.update(self.by_domain.get(key, {}))
+        return list(ips)
+
+    def shared_names(self) -> dict:
+        """Hostnames seen on more than one IP (load balancers, CDNs)."""
+        return {name: list(ips) for name, ips in self.by_name.items() if len(ips) > 1}
+
+
 # =============================================================================
 # Output Generators
 # =============================================================================
 
-def generate_markdown(hosts: list, include_scripts: bool = True) -> str:
-    """Generate markdown output from parsed hosts."""
+def generate_markdown(hosts: list, include_scripts: bool = True,
+                      script_store: Optional[ScriptStore] = None,
+                      hostname_index: Optional[HostnameIndex] = None) -> str:
+    """
+    Generate markdown output from parsed hosts.
+    With a script_store, expandable script sections (inline HTML) are added
+    per host/port, and each unique output is rendered once at the end.
+    With a hostname_index, a Virtual Hosts section is added.
+    """
     lines = []
     
     lines.append("# Nmap Scan Results\n")
@@ -396,6 +776,26 @@ def generate_markdown(hosts: list, include_scripts: bool = True) -> str:
         lines.append(f"| {host.ip} | {hostnames} | {os_info} | {port_count} |")
     
     lines.append("")
+    
+    if hostname_index is not None:
+        lines.append("## Virtual Hosts\n")
+        multi = [host for host in hosts if len(host.hostnames) > 1]
+        shared = hostname_index.shared_names()
+        if multi:
+            lines.append("| IP | Names | Hostnames |")
+            lines.append("|:---|------:|:----------|")
+            for host in multi:
+                lines.append(f"| {host.ip} | {len(host.hostnames)} | {', '.join(host.hostnames)} |")
+            lines.append("")
+        if shared:
+            lines.append("| Hostname | IPs |")
+            lines.append("|:---------|:----|")
+            for name, ips in shared.items():
+                lines.append(f"| {name} | {', '.join(ips)} |")
+            lines.append("")
+        if not multi and not shared:
+            lines.append("*No virtual hosts detected*\n")
+    
     lines.append("## Host Details\n")
     
     for host in hosts:
@@ -410,6 +810,10 @@ def generate_markdown(hosts: list, include_scripts: bool = True) -> str:
         
         lines.append("")
         
+        if script_store is not None and host.script_refs:
+            lines.append(render_script_refs("Host", host.script_refs))
+            lines.append("")
+        
         if not host.ports:
             lines.append("*No open ports detected*\n")
             continue
@@ -462,6 +866,18 @@ def generate_markdown(hosts: list, include_scripts: bool = True) -> str:
                 lines.append(f"| {port_str} | {port.service} | {version} | {extra} |")
         
         lines.append("")
+        
+        if script_store is not None:
+            for port in host.ports:
+                if port.script_refs:
+                    lines.append(render_script_refs(f"{port.port}/{port.protocol}", port.script_refs))
+            lines.append("")
+    
+    if script_store is not None and script_store.blobs:
+        lines.append("## Script Output\n")
+        for digest, tree in script_store.blobs.items():
+            lines.append(render_script_blob(digest, tree, script_store.refs.get(digest, 0)))
+        lines.append("")
     
     return "\n".join(lines)
 
@@ -483,73 +899,20 @@ def generate_csv(hosts: list) -> str:
     return "\n".join(lines)
 
 
-def markdown_to_html(markdown_text: str, title: str = "Nmap Scan Report") -> str:
-    """Convert markdown to styled HTML document."""
-    
-    # Simple markdown to HTML conversion (no external dependencies)
-    html_content = markdown_text
-    
-    # Headers
-    html_content = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
-    
-    # Bold
-    html_content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html_content)
-    
-    # Italic
-    html_content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html_content)
-    
-    # Tables
-    lines = html_content.split('\n')
-    in_table = False
-    new_lines = []
-    
-    for i, line in enumerate(lines):
-        # Detect table row
-        if line.strip().startswith('|') and line.strip().endswith('|'):
-            cells = [c.strip() for c in line.strip()[1:-1].split('|')]
-            
-            # Check if separator row
-            if all(re.match(r'^:?-+:?$', c) for c in cells):
-                continue  # Skip separator
-            
-            if not in_table:
-                new_lines.append('<table>')
-                in_table = True
-                # First row is header
-                new_lines.append('<thead><tr>')
-                for cell in cells:
-                    new_lines.append(f'<th>{cell}</th>')
-                new_lines.append('</tr></thead>')
-                new_lines.append('<tbody>')
-            else:
-                new_lines.append('<tr>')
-                for cell in cells:
-                    new_lines.append(f'<td>{cell}</td>')
-                new_lines.append('</tr>')
-        else:
-            if in_table:
-                new_lines.append('</tbody></table>')
-                in_table = False
-            new_lines.append(line)
-    
-    if in_table:
-        new_lines.append('</tbody></table>')
-    
-    html_content = '\n'.join(new_lines)
-    
-    # Paragraphs (simple: convert double newlines)
-    html_content = re.sub(r'\n\n+', '\n</p>\n<p>\n', html_content)
-    
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        :root {{
+# Report template: patterns are compiled once and the stylesheet is built
+# once per theme, so batch rendering only pays for the per-report content.
+HEADER_PATTERNS = [
+    (re.compile(r'^### (.+)$', re.MULTILINE), r'<h3>\1</h3>'),
+    (re.compile(r'^## (.+)$', re.MULTILINE), r'<h2>\1</h2>'),
+    (re.compile(r'^# (.+)$', re.MULTILINE), r'<h1>\1</h1>'),
+]
+BOLD_PATTERN = re.compile(r'\*\*(.+?)\*\*')
+ITALIC_PATTERN = re.compile(r'\*(.+?)\*')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^:?-+:?$')
+PARAGRAPH_PATTERN = re.compile(r'\n\n+')
+
+THEMES = {
+    "dark": """        :root {
             --bg-primary: #1a1a2e;
             --bg-secondary: #16213e;
             --bg-table: #0f0f1a;
@@ -559,41 +922,56 @@ def markdown_to_html(markdown_text: str, title: str = "Nmap Scan Report") -> str
             --accent-dim: #0a4f5c;
             --border: #333;
             --highlight: #e94560;
-        }}
-        * {{
+        }
+""",
+    "light": """        :root {
+            --bg-primary: #ffffff;
+            --bg-secondary: #f3f5f8;
+            --bg-table: #fafbfc;
+            --text-primary: #1f2328;
+            --text-secondary: #59636e;
+            --accent: #0969da;
+            --accent-dim: #b6d4fb;
+            --border: #d1d9e0;
+            --highlight: #cf222e;
+        }
+""",
+}
+
+REPORT_CSS = """        * {
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
             background: var(--bg-primary);
             color: var(--text-primary);
             line-height: 1.6;
             margin: 0;
             padding: 20px;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1400px;
             margin: 0 auto;
-        }}
-        h1 {{
+        }
+        h1 {
             color: var(--accent);
             border-bottom: 2px solid var(--accent);
             padding-bottom: 10px;
             margin-top: 0;
-        }}
-        h2 {{
+        }
+        h2 {
             color: var(--accent);
             margin-top: 30px;
             border-left: 4px solid var(--accent);
             padding-left: 12px;
-        }}
-        h3 {{
+        }
+        h3 {
             color: var(--highlight);
             margin-top: 25px;
             font-family: 'Consolas', 'Monaco', monospace;
             font-size: 1.3em;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 15px 0;
@@ -601,77 +979,247 @@ def markdown_to_html(markdown_text: str, title: str = "Nmap Scan Report") -> str
             border-radius: 8px;
             overflow: hidden;
             font-size: 0.9em;
-        }}
-        th {{
+        }
+        th {
             background: var(--bg-secondary);
             color: var(--accent);
             text-align: left;
             padding: 12px 10px;
             font-weight: 600;
             border-bottom: 2px solid var(--accent-dim);
-        }}
-        td {{
+        }
+        td {
             padding: 10px;
             border-bottom: 1px solid var(--border);
             vertical-align: top;
-        }}
-        tr:hover {{
+        }
+        tr:hover {
             background: var(--bg-secondary);
-        }}
-        tr:last-child td {{
+        }
+        tr:last-child td {
             border-bottom: none;
-        }}
+        }
         /* Port column styling */
-        td:first-child {{
+        td:first-child {
             font-family: 'Consolas', 'Monaco', monospace;
             color: var(--accent);
             white-space: nowrap;
-        }}
-        strong {{
+        }
+        strong {
             color: var(--accent);
-        }}
-        em {{
+        }
+        em {
             color: var(--text-secondary);
             font-style: normal;
-        }}
-        p {{
+        }
+        p {
             margin: 8px 0;
-        }}
+        }
         /* Responsive */
-        @media (max-width: 768px) {{
-            table {{
+        @media (max-width: 768px) {
+            table {
                 font-size: 0.8em;
-            }}
-            td, th {{
+            }
+            td, th {
                 padding: 6px 4px;
-            }}
-        }}
+            }
+        }
         /* Print styles */
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
                 color: black;
-            }}
-            table {{
+            }
+            table {
                 background: white;
-            }}
-            th {{
+            }
+            th {
                 background: #f0f0f0;
                 color: black;
-            }}
-            h1, h2, h3, strong, td:first-child {{
+            }
+            h1, h2, h3, strong, td:first-child {
                 color: black;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+{assets}
 </head>
 <body>
 <div class="container">
-{html_content}
+{content}
 </div>
 </body>
 </html>"""
 
+# Only added when full script output (--all-scripts) is rendered
+SCRIPT_CSS = """        /* NSE script sections */
+        details {
+            margin: 4px 0;
+        }
+        summary {
+            cursor: pointer;
+            color: var(--text-secondary);
+            font-family: 'Consolas', 'Monaco', monospace;
+        }
+        details ul {
+            margin: 4px 0;
+            padding-left: 20px;
+        }
+        details a {
+            color: var(--accent);
+        }
+        details pre {
+            background: var(--bg-table);
+            border: 1px solid var(--border);
+            padding: 8px;
+            overflow-x: auto;
+            white-space: pre-wrap;
+        }
+"""
+
+STYLESHEET_NAME = "nmap2html.css"
+
+
+@lru_cache(maxsize=None)
+def build_stylesheet(theme: str = "dark", script_css: bool = False) -> str:
+    """
+    Return the report CSS for a built-in theme name or a user .css file.
+    A user file is appended after the dark theme, so it can override the
+    :root variables or any rule.
+    """
+    extra = SCRIPT_CSS if script_css else ""
+    if theme in THEMES:
+        return THEMES[theme] + REPORT_CSS + extra
+    with open(theme, 'r', encoding='utf-8') as f:
+        return THEMES["dark"] + REPORT_CSS + extra + f.read()
+
+
+def write_stylesheet(path: str, theme: str = "dark"):
+    """
+    Write the shared stylesheet that linked reports reference. It always
+    includes the NSE script rules: a linked file costs nothing per report.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(build_stylesheet(theme, script_css=True))
+
+
+def markdown_to_html(markdown_text: str, title: str = "Nmap Scan Report",
+                     theme: str = "dark", css_href: Optional[str] = None,
+                     script_css: bool = False) -> str:
+    """
+    Convert markdown to styled HTML document.
+    CSS is inlined unless css_href points at a shared stylesheet
+    (see write_stylesheet), which keeps batch reports small.
+    script_css adds the rules for expandable NSE script sections.
+    """
+    
+    # Simple markdown to HTML conversion (no external dependencies)
+    html_content = markdown_text
+    
+    # Headers
+    for pattern, replacement in HEADER_PATTERNS:
+        html_content = pattern.sub(replacement, html_content)
+    
+    # Bold
+    html_content = BOLD_PATTERN.sub(r'<strong>\1</strong>', html_content)
+    
+    # Italic
+    html_content = ITALIC_PATTERN.sub(r'<em>\1</em>', html_content)
+    
+    # Tables
+    lines = html_content.split('\n')
+    in_table = False
+    new_lines = []
+    
+    for i, line in enumerate(lines):
+        # Detect table row
+        if line.strip().startswith('|') and line.strip().endswith('|'):
+            cells = [c.strip() for c in line.strip()[1:-1].split('|')]
+            
+            # Check if separator row
+            if all(TABLE_SEPARATOR_PATTERN.match(c) for c in cells):
+                continue  # Skip separator
+            
+            if not in_table:
+                new_lines.append('<table>')
+                in_table = True
+                # First row is header
+                new_lines.append('<thead><tr>')
+                for cell in cells:
+                    new_lines.append(f'<th>{cell}</th>')
+                new_lines.append('</tr></thead>')
+                new_lines.append('<tbody>')
+            else:
+                new_lines.append('<tr>')
+                for cell in cells:
+                    new_lines.append(f'<td>{cell}</td>')
+                new_lines.append('</tr>')
+        else:
+            if in_table:
+                new_lines.append('</tbody></table>')
+                in_table = False
+            new_lines.append(line)
+    
+    if in_table:
+        new_lines.append('</tbody></table>')
+    
+    html_content = '\n'.join(new_lines)
+    
+    # Paragraphs (simple: convert double newlines)
+    html_content = PARAGRAPH_PATTERN.sub('\n</p>\n<p>\n', html_content)
+    
+    if css_href:
+        assets = f'    <link rel="stylesheet" href="{html.escape(css_href)}">'
+    else:
+        assets = f"    <style>\n{build_stylesheet(theme, script_css)}    </style>"
+    
+    return REPORT_TEMPLATE.format(title=title, assets=assets, content=html_content)
+
+
+def write_host_reports(hosts: list, out_dir: str, include_scripts: bool = True,
+                       script_store: Optional[ScriptStore] = None,
+                       theme: str = "dark", title: str = "Nmap Scan Report",
+                       css_href: Optional[str] = None) -> int:
+    """
+    Write one HTML report per host into out_dir, all linking to a single
+    shared stylesheet. The stylesheet is written to out_dir unless css_href
+    points at an existing one. An IP seen again (e.g. in another
+    --append-output block) gets a -2, -3... suffix instead of overwriting.
+    Returns the number of reports written.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    if css_href is None:
+        css_href = STYLESHEET_NAME
+        write_stylesheet(str(out / STYLESHEET_NAME), theme)
+    
+    seen = {}
+    for host in hosts:
+        host_store = None
+        if script_store is not None:
+            digests = list(host.script_refs.values())
+            for port in host.ports:
+                digests.extend(port.script_refs.values())
+            host_store = script_store.subset(digests)
+        
+        md = generate_markdown([host], include_scripts=include_scripts, script_store=host_store)
+        report = markdown_to_html(md, title=f"{title} - {host.ip}", css_href=css_href)
+        name = host.ip.replace(':', '_')
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}-{seen[name]}"
+        with open(out / f"{name}.html", 'w', encoding='utf-8') as f:
+            f.write(report)
+    
+    return sum(seen.values())
+
 
 # =============================================================================
 # Main
@@ -688,65 +1236,158 @@ Examples:
     python nmap2html.py scan.xml --format md         # markdown only
     python nmap2html.py scan.xml --format csv        # CSV for spreadsheets
     python nmap2html.py scan.xml --no-scripts        # minimal tables
+    python nmap2html.py scan.xml --all-scripts       # keep full NSE output
+    python nmap2html.py scan.xml --vhosts            # add virtual hosts section
+    python nmap2html.py scan.xml --lookup example.com  # IPs for a name/domain
     python nmap2html.py scan.xml --fix-only fixed.xml  # just fix XML
+    python nmap2html.py scan.xml -j 16               # parse with 16 processes
+    python nmap2html.py scan.xml --benchmark 8,16,32 # serial vs parallel timing
+    python nmap2html.py scan.xml --theme light       # or --theme custom.css
         """
     )
-    parser.add_argument("xml_file", help="Nmap XML file to process")
+    parser.add_argument("xml_file", nargs="?",
+                        help="Nmap XML file to process")
     parser.add_argument("-o", "--output", help="Output file (default: <input>.html)")
     parser.add_argument("-f", "--format", choices=["html", "md", "csv"], default="html",
                         help="Output format (default: html)")
     parser.add_argument("--no-scripts", action="store_true",
                         help="Exclude script notes column")
+    parser.add_argument("--all-scripts", action="store_true",
+                        help="Keep full NSE output (deduplicated) as expandable sections")
+    parser.add_argument("--vhosts", action="store_true",
+                        help="Add a virtual hosts section (names per IP, names on many IPs)")
+    parser.add_argument("--lookup", metavar="NAME",
+                        help="Print IPs serving a hostname or any name under a domain, then exit")
     parser.add_argument("--fix-only", metavar="OUTPUT",
                         help="Only fix XML and write to file (no conversion)")
     parser.add_argument("--title", default="Nmap Scan Report",
                         help="HTML document title")
+    parser.add_argument("--theme", default="dark",
+                        help=f"Report theme: {', '.join(THEMES)} or a .css file (default: dark)")
+    parser.add_argument("--css-href", metavar="URL",
+                        help="Link this stylesheet instead of inlining CSS")
+    parser.add_argument("--write-css", metavar="OUTPUT",
+                        help="Write the stylesheet for --theme to a file")
+    parser.add_argument("--split-hosts", metavar="DIR",
+                        help="Write one HTML report per host into DIR with a shared stylesheet")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Parse hosts in N worker processes (0 = all cores, default: 1)")
+    parser.add_argument("--benchmark", metavar="WORKERS",
+                        help="Time serial vs parallel parsing for comma-separated worker counts")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Timing rounds per measurement (default: 3)")
     
     args = parser.parse_args()
     
-    # Read input file
-    try:
-        with open(args.xml_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"[!] File not found: {args.xml_file}", file=sys.stderr)
-        sys.exit(1)
+    if args.jobs < 0:
+        parser.error("argument -j/--jobs: must be 0 (all cores) or greater")
     
-    # Fix XML
-    try:
-        root = fix_nmap_xml(content)
-        print(f"[+] XML parsed successfully", file=sys.stderr)
-    except ValueError as e:
-        print(f"[!] {e}", file=sys.stderr)
+    if args.rounds < 1:
+        parser.error("argument --rounds: must be 1 or greater")
+    
+    if args.split_hosts and (args.vhosts or args.format != "html" or args.output):
+        parser.error("--split-hosts writes one HTML report per host; "
+                     "it cannot be combined with --vhosts, --format or -o")
+    
+    if args.theme not in THEMES and not Path(args.theme).is_file():
+        parser.error(f"unknown theme or missing CSS file: {args.theme}")
+    
+    if args.write_css:
+        write_stylesheet(args.write_css, args.theme)
+        print(f"[+] Stylesheet written to: {args.write_css}", file=sys.stderr)
+        if not args.xml_file:
+            sys.exit(0)
+    
+    if not args.xml_file:
+        parser.error("the following arguments are required: xml_file")
+    
+    if not Path(args.xml_file).is_file():
+        print(f"[!] File not found: {args.xml_file}", file=sys.stderr)
         sys.exit(1)
     
-    # Fix-only mode
-    if args.fix_only:
-        tree = ET.ElementTree(root)
-        ET.indent(tree, space='  ')
-        tree.write(args.fix_only, encoding='utf-8', xml_declaration=True)
-        print(f"[+] Fixed XML written to: {args.fix_only}", file=sys.stderr)
+    # Benchmark mode
+    if args.benchmark:
+        worker_counts = [int(w) for w in args.benchmark.split(",") if w.strip()]
+        print(benchmark_parallel(args.xml_file, worker_counts, args.rounds))
         sys.exit(0)
     
-    # Parse hosts
-    hosts = parse_nmap_xml(root)
+    script_store = ScriptStore() if args.all_scripts else None
+    
+    if args.jobs != 1 and not args.fix_only:
+        # Parallel mode: hosts are located by byte range, no full tree is built
+        try:
+            hosts = parse_nmap_file_parallel(args.xml_file, args.jobs or None, script_store)
+            print(f"[+] XML parsed successfully ({args.jobs or os.cpu_count()} workers)",
+                  file=sys.stderr)
+        except ValueError as e:
+            print(f"[!] {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        # Read input file
+        with open(args.xml_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Fix XML
+        try:
+            root = fix_nmap_xml(content)
+            print(f"[+] XML parsed successfully", file=sys.stderr)
+        except ValueError as e:
+            print(f"[!] {e}", file=sys.stderr)
+            sys.exit(1)
+        
+        # Fix-only mode
+        if args.fix_only:
+            tree = ET.ElementTree(root)
+            ET.indent(tree, space='  ')
+            tree.write(args.fix_only, encoding='utf-8', xml_declaration=True)
+            print(f"[+] Fixed XML written to: {args.fix_only}", file=sys.stderr)
+            sys.exit(0)
+        
+        # Parse hosts
+        hosts = parse_nmap_xml(root, script_store)
     
     if not hosts:
         print("[!] No hosts found in scan", file=sys.stderr)
         sys.exit(1)
     
     print(f"[+] Found {len(hosts)} host(s)", file=sys.stderr)
+    # Hostname lookup mode
+    if args.lookup:
+        ips = HostnameIndex(hosts).lookup(args.lookup)
+        for ip in ips:
+            print(ip)
+        sys.exit(0 if ips else 1)
+    
+    hostname_index = HostnameIndex(hosts) if args.vhosts else None
+    
+    if script_store is not None:
+        print(f"[+] Stored {len(script_store)} unique script output(s) "
+              f"for {sum(script_store.refs.values())} reference(s)", file=sys.stderr)
+    
+    # Per-host batch mode
+    if args.split_hosts:
+        count = write_host_reports(hosts, args.split_hosts, include_scripts=not args.no_scripts,
+                                   script_store=script_store, theme=args.theme, title=args.title,
+                                   css_href=args.css_href)
+        print(f"[+] {count} report(s) written to: {args.split_hosts}", file=sys.stderr)
+        sys.exit(0)
     
     # Generate output
     if args.format == "csv":
         output = generate_csv(hosts)
         ext = ".csv"
     elif args.format == "md":
-        output = generate_markdown(hosts, include_scripts=not args.no_scripts)
+        output = generate_markdown(hosts, include_scripts=not args.no_scripts,
+                                   script_store=script_store,
+                                   hostname_index=hostname_index)
         ext = ".md"
     else:  # html
-        md = generate_markdown(hosts, include_scripts=not args.no_scripts)
-        output = markdown_to_html(md, title=args.title)
+        md = generate_markdown(hosts, include_scripts=not args.no_scripts,
+                               script_store=script_store,
+                               hostname_index=hostname_index)
+        output = markdown_to_html(md, title=args.title, theme=args.theme,
+                                  css_href=args.css_href,
+                                  script_css=script_store is not None)
         ext = ".html"
     
     # Determine output path
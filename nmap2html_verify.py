@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+nmap2html_verify.py - Differential correctness and perf regression harness
+
+Runs a corpus of nmap XML files through the reference path
+(fix_nmap_xml -> parse_nmap_xml -> generators) and through every
+alternative engine, checks HostInfo and rendered output are identical,
+and records throughput and peak memory against stored baselines.
+
+Usage:
+    python nmap2html_verify.py                          # synthetic corpus only
+    python nmap2html_verify.py scans/                   # + every scans/*.xml
+    python nmap2html_verify.py scans/ --baseline perf.json --update-baseline
+    python nmap2html_verify.py scans/ --baseline perf.json --max-regression 10
+    python nmap2html_verify.py scan.xml --benchmark-render
+"""
+
+import re
+import sys
+import html
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree as ET
+
+from nmap2html import (
+    ScriptStore,
+    HostnameIndex,
+    parse_nmap_file,
+    parse_nmap_file_parallel,
+    generate_markdown,
+    generate_csv,
+    markdown_to_html,
+    STYLESHEET_NAME,
+)
+
+
+# =============================================================================
+# Engines and Corpus
+# =============================================================================
+
+# Alternative engines checked against parse_nmap_file. Each takes
+# (path, script_store) and must return the same HostInfo list.
+ENGINES = {
+    "parallel": lambda path, script_store: parse_nmap_file_parallel(path, None, script_store),
+}
+
+SYNTHETIC_CORPUS = [
+    # (name, hosts, nmaprun blocks, generator options)
+    ("synthetic-500", 500, 1, {}),
+    ("synthetic-append-3000", 3000, 3, {}),
+    ("synthetic-append-truncated", 3000, 3, {"truncate": True}),
+    ("synthetic-append-malformed", 3000, 3, {"corrupt_block": 1}),
+]
+
+# Peak memory below this much growth is treated as noise
+MEMORY_SLACK_MB = 1.0
+
+
+def generate_synthetic_scan(n_hosts: int, blocks: int = 1, seed: int = 0,
+                            truncate: bool = False,
+                            corrupt_block: Optional[int] = None) -> str:
+    """
+    Generate a deterministic nmap XML scan with the script output the
+    extractors care about. blocks > 1 mimics --append-output XML;
+    truncate cuts the last block off mid-host (an interrupted scan) and
+    corrupt_block leaves an unclosed tag inside that block.
+    """
+    rng = random.Random(seed)
+    q = lambda value: html.escape(str(value), quote=True)
+    banners = ["Apache/2.4.57 (Debian)", "nginx/1.24.0", "Microsoft-IIS/10.0"]
+    titles = ["Login", "IIS Windows Server", "Welcome to nginx!", "Dashboard"]
+    hostkeys = [("ssh-rsa", 3072), ("ecdsa-sha2-nistp256", 256), ("ssh-ed25519", 256)]
+
+    def host_xml(i: int, corrupt: bool = False) -> str:
+        ip = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        domain = f"corp{i % 7}.example.com"
+        state = "down" if rng.random() < 0.05 else "up"
+        out = [f'<host starttime="1700000000"><status state="{state}" reason="syn-ack"/>']
+        out.append(f'<address addr="{ip}" addrtype="ipv4"/>')
+        if rng.random() < 0.3:
+            out.append(f'<address addr="00:50:56:{i % 256:02X}:00:01" addrtype="mac" vendor="VMware"/>')
+        out.append(f'<hostnames><hostname name="h{i}.{domain}" type="PTR"/></hostnames><ports>')
+        out.append('<port protocol="tcp" portid="25"><state state="closed"/></port>')
+
+        out.append('<port protocol="tcp" portid="22"><state state="open"/>'
+                   '<service name="ssh" product="OpenSSH" version="9.2p1" ostype="Linux">'
+                   '<cpe>cpe:/a:openbsd:openssh:9.2p1</cpe></service>'
+                   '<script id="ssh-hostkey" output="&#xa;  3072 aa:bb (RSA)">')
+        for key_type, bits in hostkeys:
+            out.append(f'<table><elem key="type">{key_type}</elem><elem key="bits">{bits}</elem></table>')
+        out.append('</script>')
+        if corrupt:
+            out.append('<script id="banner" output="">')  # never closed
+        out.append('</port>')
+
+        if rng.random() < 0.6:
+            sans = ", ".join(f"DNS:{name}" for name in
+                             [f"h{i}.{domain}", f"*.{domain}", f"lb.{domain}"] +
+                             [f"vh{j}.{domain}" for j in range(rng.randint(0, 40))])
+            title = rng.choice(titles)
+            out.append('<port protocol="tcp" portid="443"><state state="open"/>'
+                       f'<service name="http" product="{q(rng.choice(banners))}" tunnel="ssl"/>'
+                       f'<script id="http-title" output="{q(title)}"><elem key="title">{q(title)}</elem></script>'
+                       f'<script id="ssl-cert" output="Subject: commonName=*.{domain}">'
+                       f'<table key="subject"><elem key="commonName">*.{domain}</elem></table>'
+                       '<table key="extensions"><table><elem key="name">X509v3 Subject Alternative Name</elem>'
+                       f'<elem key="value">{q(sans)}</elem></table></table>'
+                       '<table key="validity"><elem key="notAfter">2030-01-01T00:00:00</elem></table>'
+                       '</script>'
+                       '<script id="http-methods" output="Potentially risky methods: TRACE">'
+                       '<table key="Potentially risky methods"><elem>TRACE</elem></table></script>'
+                       '</port>')
+
+        if rng.random() < 0.3:
+            out.append('<port protocol="tcp" portid="3389"><state state="open"/>'
+                       '<service name="ms-wbt-server" product="Microsoft Terminal Services"/>'
+                       '<script id="rdp-ntlm-info" output="">'
+                       f'<elem key="DNS_Computer_Name">ws{i}.{domain}</elem>'
+                       f'<elem key="NetBIOS_Computer_Name">WS{i}</elem>'
+                       f'<elem key="DNS_Domain_Name">{domain}</elem>'
+                       '<elem key="Product_Version">10.0.19041</elem></script></port>')
+
+        out.append('</ports>')
+        if rng.random() < 0.3:
+            out.append('<hostscript><script id="smb-os-discovery" output="OS: Windows 10">'
+                       f'<elem key="fqdn">ws{i}.{domain}</elem></script></hostscript>')
+        if rng.random() < 0.5:
+            out.append('<os><osmatch name="Linux 5.0 - 5.14" accuracy="95">'
+                       '<osclass osfamily="Linux"/></osmatch></os>'
+                       '<uptime seconds="86400" lastboot="Mon Jan  1 00:00:00 2024"/>'
+                       '<distance value="2"/>')
+        out.append('</host>')
+        return "".join(out)
+
+    per_block = -(-n_hosts // blocks)
+    parts = []
+    for b in range(blocks):
+        first, last = b * per_block, min(n_hosts, (b + 1) * per_block)
+        parts.append('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<nmaprun scanner="nmap" args="nmap -sC -sV" version="7.94">\n'
+                     '<scaninfo type="syn" protocol="tcp"/>\n')
+        for i in range(first, last):
+            parts.append(host_xml(i, corrupt=(b == corrupt_block and i == first + 1)) + "\n")
+        if truncate and b == blocks - 1:
+            # Interrupted scan: last host is cut in half, no closing tags
+            parts[-1] = parts[-1][:len(parts[-1]) // 2]
+            break
+        parts.append(f'<runstats><hosts up="{per_block}" total="{per_block}"/></runstats>\n</nmaprun>\n')
+    return "".join(parts)
+
+
+def write_synthetic_corpus(directory: str, corpus: list = SYNTHETIC_CORPUS) -> list:
+    """Write synthetic scans into directory and return [(name, path)]."""
+    entries = []
+    for name, n_hosts, blocks, options in corpus:
+        path = Path(directory) / f"{name}.xml"
+        path.write_text(generate_synthetic_scan(n_hosts, blocks, **options), encoding='utf-8')
+        entries.append((name, str(path)))
+    return entries
+
+
+# =============================================================================
+# Reference Renderer - markdown_to_html before the precompiled template
+# =============================================================================
+
+def reference_markdown_to_html(markdown_text: str, title: str = "Nmap Scan Report") -> str:
+    """Baseline markdown_to_html (per-call f-string template and re.sub)."""
+
+    # Simple markdown to HTML conversion (no external dependencies)
+    html_content = markdown_text
+
+    # Headers
+    html_content = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
+    html_content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
+
+    # Bold
+    html_content = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html_content)
+
+    # Italic
+    html_content = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html_content)
+
+    # Tables
+    lines = html_content.split('\n')
+    in_table = False
+    new_lines = []
+
+    for i, line in enumerate(lines):
+        # Detect table row
+        if line.strip().startswith('|') and line.strip().endswith('|'):
+            cells = [c.strip() for c in line.strip()[1:-1].split('|')]
+
+            # Check if separator row
+            if all(re.match(r'^:?-+:?$', c) for c in cells):
+                continue  # Skip separator
+
+            if not in_table:
+                new_lines.append('<table>')
+                in_table = True
+                # First row is header
+                new_lines.append('<thead><tr>')
+                for cell in cells:
+                    new_lines.append(f'<th>{cell}</th>')
+                new_lines.append('</tr></thead>')
+                new_lines.append('<tbody>')
+            else:
+                new_lines.append('<tr>')
+                for cell in cells:
+                    new_lines.append(f'<td>{cell}</td>')
+                new_lines.append('</tr>')
+        else:
+            if in_table:
+                new_lines.append('</tbody></table>')
+                in_table = False
+            new_lines.append(line)
+
+    if in_table:
+        new_lines.append('</tbody></table>')
+
+    html_content = '\n'.join(new_lines)
+
+    # Paragraphs (simple: convert double newlines)
+    html_content = re.sub(r'\n\n+', '\n</p>\n<p>\n', html_content)
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        :root {{
+            --bg-primary: #1a1a2e;
+            --bg-secondary: #16213e;
+            --bg-table: #0f0f1a;
+            --text-primary: #eee;
+            --text-secondary: #aaa;
+            --accent: #00d9ff;
+            --accent-dim: #0a4f5c;
+            --border: #333;
+            --highlight: #e94560;
+        }}
+        * {{
+            box-sizing: border-box;
+        }}
+        body {{
+            font-family: 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
+            background: var(--bg-primary);
+            color: var(--text-primary);
+            line-height: 1.6;
+            margin: 0;
+            padding: 20px;
+        }}
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+        }}
+        h1 {{
+            color: var(--accent);
+            border-bottom: 2px solid var(--accent);
+            padding-bottom: 10px;
+            margin-top: 0;
+        }}
+        h2 {{
+            color: var(--accent);
+            margin-top: 30px;
+            border-left: 4px solid var(--accent);
+            padding-left: 12px;
+        }}
+        h3 {{
+            color: var(--highlight);
+            margin-top: 25px;
+            font-family: 'Consolas', 'Monaco', monospace;
+            font-size: 1.3em;
+        }}
+        table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+            background: var(--bg-table);
+            border-radius: 8px;
+            overflow: hidden;
+            font-size: 0.9em;
+        }}
+        th {{
+            background: var(--bg-secondary);
+            color: var(--accent);
+            text-align: left;
+            padding: 12px 10px;
+            font-weight: 600;
+            border-bottom: 2px solid var(--accent-dim);
+        }}
+        td {{
+            padding: 10px;
+            border-bottom: 1px solid var(--border);
+            vertical-align: top;
+        }}
+        tr:hover {{
+            background: var(--bg-secondary);
+        }}
+        tr:last-child td {{
+            border-bottom: none;
+        }}
+        /* Port column styling */
+        td:first-child {{
+            font-family: 'Consolas', 'Monaco', monospace;
+            color: var(--accent);
+            white-space: nowrap;
+        }}
+        strong {{
+            color: var(--accent);
+        }}
+        em {{
+            color: var(--text-secondary);
+            font-style: normal;
+        }}
+        p {{
+            margin: 8px 0;
+        }}
+        /* Responsive */
+        @media (max-width: 768px) {{
+            table {{
+                font-size: 0.8em;
+            }}
+            td, th {{
+                padding: 6px 4px;
+            }}
+        }}
+        /* Print styles */
+        @media print {{
+            body {{
+                background: white;
+                color: black;
+            }}
+            table {{
+                background: white;
+            }}
+            th {{
+                background: #f0f0f0;
+                color: black;
+            }}
+            h1, h2, h3, strong, td:first-child {{
+                color: black;
+            }}
+        }}
+    </style>
+</head>
+<body>
+<div class="container">
+{html_content}
+</div>
+</body>
+</html>"""
+
+
+# =============================================================================
+# Harness
+# =============================================================================
+
+def render_matches_reference(hosts: list) -> bool:
+    """markdown_to_html must stay byte-identical to the baseline renderer."""
+    for md in (generate_markdown(hosts), generate_markdown(hosts, include_scripts=False)):
+        if markdown_to_html(md) != reference_markdown_to_html(md):
+            return False
+    return True
+
+
+def render_all(hosts: list, script_store: ScriptStore) -> tuple:
+    """Render every output variant the CLI can produce from a host list."""
+    outputs = [generate_csv(hosts)]
+    for md in (
+        generate_markdown(hosts),
+        generate_markdown(hosts, include_scripts=False),
+        generate_markdown(hosts, script_store=script_store,
+                          hostname_index=HostnameIndex(hosts)),
+    ):
+        outputs.extend([md, markdown_to_html(md, script_css=True)])
+    return tuple(outputs)
+
+
+def _measure(fn, rounds: int) -> tuple:
+    """Return (result, best wall seconds, peak traced MB of one extra run)."""
+    best, result = None, None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def _first_difference(expected: list, actual: list) -> str:
+    if len(expected) != len(actual):
+        return f"{len(actual)} host(s), expected {len(expected)}"
+    for want, got in zip(expected, actual):
+        if want != got:
+            return f"host {want.ip} differs"
+    return "rendered output differs"
+
+
+def run_verification(corpus: list, engines: dict, baseline: dict,
+                     max_regression: float = 20.0, max_memory_growth: float = 50.0,
+                     rounds: int = 3) -> tuple:
+    """
+    Run every corpus file through the reference path and each engine.
+    Returns (report lines, measurements, ok). A run fails when a file
+    cannot be parsed, on any HostInfo or rendered-output mismatch, when
+    hosts/s drops more than max_regression percent below the baseline, or
+    when peak memory grows more than max_memory_growth percent above it.
+    Peak memory is traced in this process only (worker processes are not
+    counted).
+    """
+    ok = True
+    measurements = {}
+    lines = [
+        "| Check | Corpus | Hosts/s | Base Hosts/s | Peak MB | Base Peak MB | Result |",
+        "|:------|:-------|--------:|-------------:|--------:|-------------:|:-------|",
+    ]
+
+    def fail(check: str, name: str, result: str):
+        nonlocal ok
+        ok = False
+        lines.append(f"| {check} | {name} | - | - | - | - | {result} |")
+
+    def record(check: str, name: str, n_hosts: int, seconds: float, peak: float, result: str):
+        nonlocal ok
+        key = f"{check}:{name}"
+        rate = n_hosts / seconds if seconds else 0.0
+        measurements[key] = {"hosts_per_sec": round(rate, 1), "peak_mb": round(peak, 2)}
+        base = baseline.get(key, {})
+        base_rate, base_peak = base.get("hosts_per_sec"), base.get("peak_mb")
+        if result == "ok" and base_rate and rate < base_rate * (1 - max_regression / 100):
+            result = f"SLOWER ({(1 - rate / base_rate) * 100:.0f}% below baseline)"
+        if (result == "ok" and base_peak is not None
+                and peak > base_peak * (1 + max_memory_growth / 100)
+                and peak - base_peak > MEMORY_SLACK_MB):
+            result = f"MEMORY (+{peak - base_peak:.1f} MB over baseline)"
+        if result != "ok":
+            ok = False
+        base_rate_str = f"{base_rate:.0f}" if base_rate else "-"
+        base_peak_str = f"{base_peak:.1f}" if base_peak is not None else "-"
+        lines.append(f"| {check} | {name} | {rate:.0f} | {base_rate_str} | "
+                     f"{peak:.1f} | {base_peak_str} | {result} |")
+
+    for name, path in corpus:
+        try:
+            _, seconds, peak = _measure(lambda: parse_nmap_file(path, ScriptStore()), rounds)
+            ref_store = ScriptStore()
+            expected = parse_nmap_file(path, ref_store)
+        except (ValueError, ET.ParseError, UnicodeDecodeError) as e:
+            fail("reference", name, f"ERROR ({e})")
+            continue
+        record("reference", name, len(expected), seconds, peak, "ok")
+
+        rendered, seconds, peak = _measure(lambda: render_all(expected, ref_store), rounds)
+        result = "ok" if render_matches_reference(expected) else "MISMATCH (baseline renderer)"
+        record("render", name, len(expected), seconds, peak, result)
+
+        for engine, parse in engines.items():
+            try:
+                _, seconds, peak = _measure(lambda: parse(path, ScriptStore()), rounds)
+                store = ScriptStore()
+                actual = parse(path, store)
+            except (ValueError, ET.ParseError, UnicodeDecodeError) as e:
+                fail(engine, name, f"ERROR ({e})")
+                continue
+            if actual == expected and store.blobs == ref_store.blobs and render_all(actual, store) == rendered:
+                result = "ok"
+            else:
+                result = f"MISMATCH ({_first_difference(expected, actual)})"
+            record(engine, name, len(expected), seconds, peak, result)
+
+    return lines, measurements, ok
+
+
+def benchmark_render(hosts: list, rounds: int = 3) -> str:
+    """
+    Time rendering one report per host: the baseline renderer against the
+    precompiled template with inlined and with linked CSS. Renderers are
+    interleaved within each round so machine noise hits them equally;
+    KB/report is what each report costs to write.
+    """
+    reports = [generate_markdown([host]) for host in hosts]
+    renderers = [
+        ("baseline, inline CSS", reference_markdown_to_html),
+        ("precompiled, inline CSS", markdown_to_html),
+        ("precompiled, linked CSS", lambda md: markdown_to_html(md, css_href=STYLESHEET_NAME)),
+    ]
+    best = [None] * len(renderers)
+    sizes = [0] * len(renderers)
+    for _ in range(rounds):
+        for i, (_, render) in enumerate(renderers):
+            t0 = time.perf_counter()
+            size = sum(len(render(md)) for md in reports)
+            elapsed = time.perf_counter() - t0
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+            sizes[i] = size
+
+    base_us = best[0] / len(reports) * 1e6
+    lines = [
+        f"# {len(reports)} per-host report(s), best of {rounds}",
+        "| Renderer | us/report | vs baseline | KB/report |",
+        "|:---------|----------:|------------:|----------:|",
+    ]
+    for (label, _), elapsed, size in zip(renderers, best, sizes):
+        us = elapsed / len(reports) * 1e6
+        lines.append(f"| {label} | {us:.1f} | {(us / base_us - 1) * 100:+.0f}% | "
+                     f"{size / len(reports) / 1024:.2f} |")
+    return "\n".join(lines)
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check nmap2html engines against the reference path and stored baselines",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python nmap2html_verify.py                                   # synthetic corpus
+    python nmap2html_verify.py scans/                            # + scans/*.xml
+    python nmap2html_verify.py scans/ --baseline perf.json --update-baseline
+    python nmap2html_verify.py scans/ --baseline perf.json       # regression gate
+        """
+    )
+    parser.add_argument("corpus", nargs="?",
+                        help="Nmap XML file or directory of *.xml files (synthetic scans always run)")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help=f"Engines to verify (default: {','.join(ENGINES)})")
+    parser.add_argument("--baseline", metavar="JSON",
+                        help="Throughput/memory baseline file")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write measurements to the --baseline file")
+    parser.add_argument("--max-regression", type=float, default=20.0, metavar="PCT",
+                        help="Fail when hosts/s drops more than PCT%% (default: 20)")
+    parser.add_argument("--max-memory-growth", type=float, default=50.0, metavar="PCT",
+                        help="Fail when peak memory grows more than PCT%% (default: 50)")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Timing rounds per measurement (default: 3)")
+    parser.add_argument("--benchmark-render", action="store_true",
+                        help="Time per-host report rendering, baseline vs precompiled template")
+
+    args = parser.parse_args()
+
+    if args.rounds < 1:
+        parser.error("argument --rounds: must be 1 or greater")
+
+    engines = {}
+    for name in filter(None, args.engines.split(",")):
+        if name not in ENGINES:
+            parser.error(f"unknown engine: {name}")
+        engines[name] = ENGINES[name]
+
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline requires --baseline")
+
+    baseline = {}
+    if args.baseline and not args.update_baseline:
+        if not Path(args.baseline).is_file():
+            parser.error(f"baseline file not found: {args.baseline} (use --update-baseline to create it)")
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    corpus = []
+    if args.corpus:
+        src = Path(args.corpus)
+        if not src.exists():
+            print(f"[!] File not found: {args.corpus}", file=sys.stderr)
+            sys.exit(1)
+        files = sorted(src.glob("*.xml")) if src.is_dir() else [src]
+        corpus.extend((p.name, str(p)) for p in files)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus.extend(write_synthetic_corpus(tmp))
+
+        if args.benchmark_render:
+            # Given files, or the first synthetic scan when none were given
+            for name, path in corpus[:len(corpus) - len(SYNTHETIC_CORPUS)] or corpus[:1]:
+                print(f"## {name}")
+                print(benchmark_render(parse_nmap_file(path), args.rounds))
+            sys.exit(0)
+
+        lines, measurements, ok = run_verification(
+            corpus, engines, baseline, args.max_regression,
+            args.max_memory_growth, args.rounds)
+
+    print("\n".join(lines))
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(measurements, f, indent=2, sort_keys=True)
+        print(f"[+] Baseline written to: {args.baseline}", file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
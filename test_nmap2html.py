@@ -0,0 +1,237 @@
+"""Tests for nmap2html; alternative engines must match the reference path."""
+
+import sys
+from xml.etree import ElementTree as ET
+
+import pytest
+
+import nmap2html
+from nmap2html import (
+    STYLESHEET_NAME,
+    HostInfo,
+    HostnameIndex,
+    HostnameSet,
+    ScriptStore,
+    _parent_domains,
+    build_stylesheet,
+    markdown_to_html,
+    parse_nmap_file,
+    parse_nmap_file_parallel,
+    parse_nmap_xml,
+    write_host_reports,
+    write_stylesheet,
+)
+from nmap2html_verify import (
+    ENGINES,
+    generate_synthetic_scan,
+    run_verification,
+    write_synthetic_corpus,
+)
+
+# Small enough for CI, but covers every shape of the full synthetic corpus
+CI_CORPUS = [
+    ("synthetic", 60, 1, {}),
+    ("synthetic-append", 90, 3, {}),
+    ("synthetic-append-truncated", 90, 3, {"truncate": True}),
+    ("synthetic-append-malformed", 90, 3, {"corrupt_block": 1}),
+]
+
+
+def _verify(tmp_path, baseline=None, corpus=CI_CORPUS):
+    entries = write_synthetic_corpus(str(tmp_path), corpus)
+    return run_verification(entries, ENGINES, baseline or {}, rounds=1)
+
+
+def test_engines_match_reference(tmp_path):
+    lines, measurements, ok = _verify(tmp_path)
+    assert ok, "\n".join(lines)
+    assert len(measurements) == len(CI_CORPUS) * (2 + len(ENGINES))
+
+
+def test_parallel_drops_failed_blocks_like_reference(tmp_path):
+    for options in ({"truncate": True}, {"corrupt_block": 1}, {"corrupt_block": 2}):
+        path = tmp_path / "scan.xml"
+        path.write_text(generate_synthetic_scan(90, 3, **options), encoding="utf-8")
+        ref_store, par_store = ScriptStore(), ScriptStore()
+        expected = parse_nmap_file(str(path), ref_store)
+        actual = parse_nmap_file_parallel(str(path), 2, par_store)
+        assert actual == expected
+        assert par_store.blobs == ref_store.blobs
+        assert par_store.refs == ref_store.refs
+
+
+def test_throughput_regression_fails(tmp_path):
+    _, measurements, _ = _verify(tmp_path, corpus=CI_CORPUS[:1])
+    baseline = {key: {"hosts_per_sec": value["hosts_per_sec"] * 100, "peak_mb": value["peak_mb"]}
+                for key, value in measurements.items()}
+    lines, _, ok = _verify(tmp_path, baseline, corpus=CI_CORPUS[:1])
+    assert not ok
+    assert any("SLOWER" in line for line in lines)
+
+
+def test_memory_growth_fails(tmp_path):
+    entries = write_synthetic_corpus(str(tmp_path), [("synthetic-500", 500, 1, {})])
+    baseline = {"reference:synthetic-500": {"peak_mb": 0.1}}
+    lines, _, ok = run_verification(entries, {}, baseline, rounds=1)
+    assert not ok
+    assert "MEMORY" in lines[2]
+
+
+def test_non_nmap_file_is_a_failed_row(tmp_path):
+    path = tmp_path / "x.xml"
+    path.write_text("<foo/>", encoding="utf-8")
+    lines, _, ok = run_verification([("x.xml", str(path))], ENGINES, {}, rounds=1)
+    assert not ok
+    assert "ERROR" in lines[-1]
+
+
+# =============================================================================
+# ScriptStore
+# =============================================================================
+
+SSH_HOSTKEY = ('<script id="ssh-hostkey" output="3072 aa:bb (RSA)">'
+               '<table><elem key="type">ssh-rsa</elem><elem key="bits">3072</elem></table></script>')
+
+
+def _scan(*hosts: str) -> ET.Element:
+    return ET.fromstring("<nmaprun>" + "".join(hosts) + "</nmaprun>")
+
+
+def _host(ip: str, scripts: str) -> str:
+    return (f'<host><status state="up"/><address addr="{ip}" addrtype="ipv4"/><ports>'
+            f'<port protocol="tcp" portid="22"><state state="open"/><service name="ssh"/>'
+            f'{scripts}</port></ports></host>')
+
+
+def test_identical_script_output_is_stored_once():
+    store = ScriptStore()
+    hosts = parse_nmap_xml(_scan(_host("10.0.0.1", SSH_HOSTKEY), _host("10.0.0.2", SSH_HOSTKEY)), store)
+    assert len(store) == 1
+    digest = hosts[0].ports[0].script_refs["ssh-hostkey"]
+    assert store.refs == {digest: 2}
+    # References share the store's key string instead of holding copies
+    assert hosts[1].ports[0].script_refs["ssh-hostkey"] is digest
+    assert next(iter(store.blobs)) is digest
+
+
+def test_duplicate_script_id_keeps_first():
+    other = SSH_HOSTKEY.replace("3072 aa:bb", "2048 cc:dd")
+    store = ScriptStore()
+    hosts = parse_nmap_xml(_scan(_host("10.0.0.1", SSH_HOSTKEY + other)), store)
+    refs = hosts[0].ports[0].script_refs
+    assert list(refs) == ["ssh-hostkey"]
+    assert store.refs == {refs["ssh-hostkey"]: 1}
+
+
+def test_subset_and_merge_keep_ref_counts():
+    first, second = ScriptStore(), ScriptStore()
+    parse_nmap_xml(_scan(_host("10.0.0.1", SSH_HOSTKEY), _host("10.0.0.2", SSH_HOSTKEY)), first)
+    parse_nmap_xml(_scan(_host("10.0.0.3", SSH_HOSTKEY)), second)
+    digest = next(iter(first.blobs))
+
+    assert first.subset([digest]).refs == {digest: 1}
+    assert first.subset([digest, digest]).refs == {digest: 2}
+
+    first.merge(second)
+    assert len(first) == 1
+    assert first.refs == {digest: 3}
+
+
+# =============================================================================
+# Hostnames
+# =============================================================================
+
+def test_hostname_set_dedups_in_order():
+    names = HostnameSet(["b.example.com", "a.example.com", "b.example.com", ""])
+    names.add("a.example.com")
+    names.update(["c.example.com", "b.example.com"])
+    assert list(names) == ["b.example.com", "a.example.com", "c.example.com"]
+    assert names == ["b.example.com", "a.example.com", "c.example.com"]
+    assert names[:2] == ["b.example.com", "a.example.com"]
+    assert "c.example.com" in names and len(names) == 3
+
+
+def _index() -> HostnameIndex:
+    return HostnameIndex([
+        HostInfo(ip="10.0.0.1", hostnames=HostnameSet(["www.example.com", "lb.example.com", "WS1"])),
+        HostInfo(ip="10.0.0.2", hostnames=HostnameSet(["api.corp.example.com", "lb.example.com"])),
+        HostInfo(ip="10.0.0.3", hostnames=HostnameSet(["other.test"])),
+    ])
+
+
+def test_hostname_index_lookup():
+    index = _index()
+    assert index.lookup("www.example.com") == ["10.0.0.1"]
+    assert index.lookup("WWW.Example.com.") == ["10.0.0.1"]
+    assert index.lookup("example.com") == ["10.0.0.1", "10.0.0.2"]
+    assert index.lookup("*.corp.example.com") == ["10.0.0.2"]
+    assert index.lookup("ws1") == ["10.0.0.1"]
+    assert index.lookup("missing.example.org") == []
+
+
+def test_parent_domains_skip_ip_literals_and_netbios_names():
+    assert _parent_domains("a.b.example.com") == ["b.example.com", "example.com"]
+    assert _parent_domains("example.com") == []
+    assert _parent_domains("10.0.0.1") == []
+    assert _parent_domains("fe80::1") == []
+    assert _parent_domains("ws1") == []
+
+
+def test_shared_names_only_lists_names_on_several_ips():
+    assert _index().shared_names() == {"lb.example.com": ["10.0.0.1", "10.0.0.2"]}
+
+
+# =============================================================================
+# Report Templates
+# =============================================================================
+
+def test_user_theme_overrides_root_variables(tmp_path):
+    theme = tmp_path / "theme.css"
+    theme.write_text(":root { --accent: #ff00ff; }\n", encoding="utf-8")
+    css = build_stylesheet(str(theme))
+    assert css.index("--accent: #00d9ff") < css.index("--accent: #ff00ff")
+    assert css.endswith(":root { --accent: #ff00ff; }\n")
+
+
+def test_css_href_links_instead_of_inlining():
+    report = markdown_to_html("# Scan", css_href="shared.css")
+    assert '<link rel="stylesheet" href="shared.css">' in report
+    assert "<style>" not in report
+    assert "<style>" in markdown_to_html("# Scan")
+
+
+def test_written_stylesheet_includes_script_rules(tmp_path):
+    path = tmp_path / "x.css"
+    write_stylesheet(str(path))
+    assert "details pre" in path.read_text(encoding="utf-8")
+
+
+def test_host_reports_get_only_their_own_blobs(tmp_path):
+    other = SSH_HOSTKEY.replace("3072 aa:bb", "2048 cc:dd")
+    store = ScriptStore()
+    hosts = parse_nmap_xml(_scan(_host("10.0.0.1", SSH_HOSTKEY), _host("10.0.0.2", other)), store)
+    assert write_host_reports(hosts, str(tmp_path), script_store=store) == 2
+    for host in hosts:
+        report = (tmp_path / f"{host.ip}.html").read_text(encoding="utf-8")
+        digest = host.ports[0].script_refs["ssh-hostkey"]
+        assert report.count('class="nse-blob"') == 1
+        assert f'id="nse-{digest}"' in report
+    assert (tmp_path / STYLESHEET_NAME).is_file()
+
+
+def test_host_reports_do_not_overwrite_repeated_ips(tmp_path):
+    hosts = parse_nmap_xml(_scan(_host("10.0.0.1", ""), _host("10.0.0.1", "")))
+    assert write_host_reports(hosts, str(tmp_path), css_href="../shared.css") == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["10.0.0.1-2.html", "10.0.0.1.html"]
+
+
+@pytest.mark.parametrize("option", [["--vhosts"], ["--format", "csv"], ["-o", "x.html"]])
+def test_split_hosts_rejects_conflicting_options(tmp_path, monkeypatch, option):
+    scan = tmp_path / "scan.xml"
+    scan.write_text(generate_synthetic_scan(5), encoding="utf-8")
+    argv = ["nmap2html.py", str(scan), "--split-hosts", str(tmp_path / "out"), *option]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exc:
+        nmap2html.main()
+    assert exc.value.code == 2
+    assert not (tmp_path / "out").exists()